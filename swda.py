@@ -28,6 +28,8 @@ import os
 import re
 import sys
 import glob
+import json
+import multiprocessing
 from nltk.tree import Tree
 from nltk.stem import WordNetLemmatizer
 
@@ -113,7 +115,7 @@ class CorpusReader:
             Display an overwriting progress bar if True.
         """
         i = 1
-        for filename in glob.glob(os.path.join(self.src_dirname, "sw*", "*.csv")):
+        for filename in self.transcript_filenames():
             # Optional progress bar:
             if display_progress:
                 sys.stderr.write("\r")
@@ -123,6 +125,14 @@ class CorpusReader:
             yield Transcript(filename, self.metadata)
         # Closing blank line for the progress bar:
         if display_progress: sys.stderr.write("\n") 
+
+
+    def transcript_filenames(self):
+        """
+        Sorted list of the transcript CSV filenames in the corpus, so
+        that passes through the corpus visit them in a stable order.
+        """
+        return sorted(glob.glob(os.path.join(self.src_dirname, "sw*", "*.csv")))
                     
     def iter_utterances(self, display_progress=True):
         """
@@ -146,6 +156,107 @@ class CorpusReader:
         # Closing blank line for the progress bar:
         if display_progress: sys.stderr.write("\n") 
 
+    def export_column_names(self):
+        """
+        The sorted list of column names accepted by `export`: the
+        derived columns in `EXPORT_COLUMNS`, the scalar `Utterance`
+        attributes, and the transcript metadata fields.
+        """
+        names = set(EXPORT_COLUMNS) | set(EXPORT_UTTERANCE_FIELDS)
+        for d in self.metadata.metadata.values():
+            names.update(d.keys())
+            break
+        return sorted(names)
+
+    def export(self, filename, columns, header=None, where=None, fmt=None,
+               batch_size=10000, n_jobs=1, display_progress=True):
+        """
+        Write one row per utterance to `filename`, in a single pass
+        through the corpus. Only the values that `columns` and `where`
+        call for are computed, so, for example, an export that makes
+        no use of the trees never parses them.
+
+        Parameters
+        ----------
+        filename : str
+            The output file.
+        columns : list of str
+            The column names, drawn from `export_column_names()`.
+        header : list of str or None (default: None)
+            Output names for the columns; defaults to `columns`.
+        where : str or None (default: None)
+            If given, a column name; only utterances for which its
+            value is true are written (e.g., 'tree_is_perfect_match').
+            It need not be one of `columns`.
+        fmt : str or None (default: None)
+            One of 'csv', 'jsonl', or 'parquet'. If None, inferred from
+            the extension of `filename`. 'parquet' requires pyarrow.
+        batch_size : int (default: 10000)
+            Number of rows buffered before each write.
+        n_jobs : int (default: 1)
+            Number of worker processes for reading the transcripts.
+            Rows are written in the same order either way.
+        display_progress : bool (default: True)
+            Display an overwriting progress bar if True.
+
+        Returns
+        -------
+        int
+            The number of rows written.
+        """
+        valid = set(self.export_column_names())
+        for name in list(columns) + ([where] if where else []):
+            if name not in valid:
+                raise ValueError("Unknown export column: %r" % name)
+        if header is None:
+            header = list(columns)
+        if len(header) != len(columns):
+            raise ValueError("header and columns must have the same length")
+        if fmt is None:
+            fmt = os.path.splitext(filename)[1].lstrip(".").lower()
+        if fmt not in EXPORT_WRITERS:
+            raise ValueError("Unknown export format: %r; use one of %s" % (
+                fmt, ", ".join(sorted(EXPORT_WRITERS))))
+        filenames = self.transcript_filenames()
+        writer = EXPORT_WRITERS[fmt](filename, header, columns)
+        pool = None
+        n_rows = 0
+        batch = []
+        try:
+            if n_jobs > 1:
+                pool = multiprocessing.Pool(
+                    n_jobs, initializer=_init_export_worker,
+                    initargs=(self.metadata.metadata_filename, columns, where))
+                row_lists = pool.imap(_export_worker, filenames)
+            else:
+                getters = [_export_getter(name) for name in columns]
+                where_getter = _export_getter(where) if where else None
+                row_lists = (
+                    _transcript_rows(Transcript(x, self.metadata), getters, where_getter)
+                    for x in filenames)
+            for i, rows in enumerate(row_lists, start=1):
+                # Optional progress bar:
+                if display_progress:
+                    sys.stderr.write("\r")
+                    sys.stderr.write("transcript %s" % i)
+                    sys.stderr.flush()
+                batch += rows
+                if len(batch) >= batch_size:
+                    writer.write_batch(batch)
+                    n_rows += len(batch)
+                    batch = []
+            if batch:
+                writer.write_batch(batch)
+                n_rows += len(batch)
+        finally:
+            writer.close()
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        # Closing blank line for the progress bar:
+        if display_progress: sys.stderr.write("\n")
+        return n_rows
+
 ######################################################################
 
 class Transcript:
@@ -174,7 +285,8 @@ class Transcript:
         else: # Where the supplied value is already a Metadata object.
             self.metadata = metadata
         # Get the file rows:
-        rows = list(csv.reader(open(self.swda_filename, 'rt')))
+        with open(self.swda_filename, 'rt') as f:
+            rows = list(csv.reader(f))
         # Ge the header and remove it from the rows:
         self.header = rows[0]
         rows.pop(0)
@@ -249,10 +361,11 @@ class Utterance:
                 row_value = row[i].strip()
             # Special handling of non-string values.
             if att_name == "trees":
-                if row_value:
-                    row_value = [Tree.fromstring(t)
-                                 for t in row_value.split("|||")]
-                else: row_value = []
+                # Parsing is deferred until self.trees is first accessed,
+                # since many uses of the corpus never look at the trees.
+                self._tree_strs = row_value.split("|||") if row_value else []
+                self._trees = None
+                continue
             elif att_name == "ptb_treenumbers":
                 if row_value: row_value = list(map(int, row_value.split("|||")))
                 else: row_value = []
@@ -279,6 +392,20 @@ class Utterance:
                 full_key = 'to_' + key            
             setattr(self, key, transcript_metadata[full_key])
 
+    @property
+    def trees(self):
+        """
+        The list of nltk.tree.Tree instances for this utterance, parsed
+        from the corpus strings on first access.
+        """
+        if self._trees is None:
+            self._trees = [Tree.fromstring(t) for t in self._tree_strs]
+        return self._trees
+
+    @trees.setter
+    def trees(self, val):
+        self._trees = val
+
     def damsl_act_tag(self):
         """
         Seeks to duplicate the tag simplification described at the
@@ -449,4 +576,160 @@ class Utterance:
             string = wnl.lemmatize(string)
         return (string, tag)
 
+######################################################################
+# Export support for `CorpusReader.export`.
+
+def _root_label(utt, trans):
+    """The root label of the utterance's first tree, or None."""
+    if utt.trees:
+        return utt.trees[0].label()
+    return None
+
+# Derived columns, as functions of an `Utterance` and its `Transcript`:
+EXPORT_COLUMNS = {
+    'damsl_act_tag': lambda utt, trans: utt.damsl_act_tag(),
+    'clean_text': lambda utt, trans: " ".join(utt.text_words(filter_disfluency=True)),
+    'root_label': _root_label,
+    'tree_is_perfect_match': lambda utt, trans: utt.tree_is_perfect_match()}
+
+# Scalar `Utterance` attributes that can be exported directly:
+EXPORT_UTTERANCE_FIELDS = [
+    'swda_filename',
+    'ptb_basename',
+    'conversation_no',
+    'transcript_index',
+    'act_tag',
+    'caller',
+    'utterance_index',
+    'subutterance_index',
+    'text',
+    'pos',
+    'caller_sex',
+    'caller_education',
+    'caller_birth_year',
+    'caller_dialect_area']
+
+# Integer-valued columns, for typed (Parquet) output; all others
+# except those below are strings:
+EXPORT_INT_FIELDS = {
+    'conversation_no', 'transcript_index', 'utterance_index',
+    'subutterance_index', 'caller_education', 'caller_birth_year',
+    'from_caller', 'to_caller', 'length',
+    'from_caller_education', 'to_caller_education',
+    'from_caller_birth_year', 'to_caller_birth_year'}
+
+def _export_getter(name):
+    """
+    Function of (utt, trans) for the column `name`: a derived column
+    if there is one, else an utterance attribute, else a transcript
+    metadata field.
+    """
+    if name in EXPORT_COLUMNS:
+        return EXPORT_COLUMNS[name]
+    if name in EXPORT_UTTERANCE_FIELDS:
+        return lambda utt, trans: getattr(utt, name)
+    return lambda utt, trans: getattr(trans, name)
+
+def _transcript_rows(trans, getters, where_getter=None):
+    """The list of export rows for `trans`."""
+    rows = []
+    for utt in trans.utterances:
+        if where_getter is None or where_getter(utt, trans):
+            rows.append([f(utt, trans) for f in getters])
+    return rows
+
+# Per-process state for the `n_jobs > 1` case of `CorpusReader.export`.
+# Each worker builds its own `Metadata` once, and receives only
+# transcript filenames:
+_export_worker_state = {}
+
+def _init_export_worker(metadata_filename, columns, where):
+    _export_worker_state['metadata'] = Metadata(metadata_filename)
+    _export_worker_state['getters'] = [_export_getter(name) for name in columns]
+    _export_worker_state['where_getter'] = _export_getter(where) if where else None
+
+def _export_worker(swda_filename):
+    trans = Transcript(swda_filename, _export_worker_state['metadata'])
+    return _transcript_rows(
+        trans,
+        _export_worker_state['getters'],
+        _export_worker_state['where_getter'])
+
+######################################################################
+# Writers for `CorpusReader.export`. Each is built from the output
+# filename, header, and column names, and writes lists of rows with
+# `write_batch` until `close` is called.
+
+EXPORT_BUFFER_SIZE = 1 << 20
+
+class CsvExportWriter:
+    """CSV output, with `header` as the first row."""
+    def __init__(self, filename, header, columns):
+        self.f = open(filename, 'wt', newline='', buffering=EXPORT_BUFFER_SIZE)
+        self.csvwriter = csv.writer(self.f)
+        self.csvwriter.writerow(header)
+
+    def write_batch(self, rows):
+        self.csvwriter.writerows(rows)
+
+    def close(self):
+        self.f.close()
+
+class JsonlExportWriter:
+    """JSON Lines output: one object per row, keyed by `header`."""
+    def __init__(self, filename, header, columns):
+        self.f = open(filename, 'wt', buffering=EXPORT_BUFFER_SIZE)
+        self.header = header
+
+    def write_batch(self, rows):
+        self.f.write("".join(
+            json.dumps(dict(zip(self.header, row)), default=_json_default) + "\n"
+            for row in rows))
+
+    def close(self):
+        self.f.close()
+
+def _json_default(val):
+    # The only non-JSON value in the corpus is the metadata talk_day.
+    if isinstance(val, datetime.datetime):
+        return val.isoformat()
+    raise TypeError("Cannot serialize %r" % (val,))
+
+class ParquetExportWriter:
+    """
+    Parquet (binary, columnar) output, with one row group per batch.
+    Requires pyarrow.
+    """
+    def __init__(self, filename, header, columns):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow: pip install pyarrow")
+        self.pa = pa
+        fields = []
+        for name, col in zip(header, columns):
+            if col in EXPORT_INT_FIELDS:
+                typ = pa.int64()
+            elif col == 'tree_is_perfect_match':
+                typ = pa.bool_()
+            elif col == 'talk_day':
+                typ = pa.timestamp('s')
+            else:
+                typ = pa.string()
+            fields.append(pa.field(name, typ))
+        self.schema = pa.schema(fields)
+        self.writer = pq.ParquetWriter(filename, self.schema)
+
+    def write_batch(self, rows):
+        arrays = [self.pa.array(list(col), type=field.type)
+                  for col, field in zip(zip(*rows), self.schema)]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
 
+EXPORT_WRITERS = {
+    'csv': CsvExportWriter,
+    'jsonl': JsonlExportWriter,
+    'parquet': ParquetExportWriter}
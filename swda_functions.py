@@ -13,7 +13,6 @@ __email__ = "See the author's website"
 
 ######################################################################
 
-import csv
 from collections import defaultdict
 from operator import itemgetter
 from swda import CorpusReader
@@ -74,12 +73,11 @@ def act_tags_and_rootlabels():
     restricting attention to cases in which utt has a single,
     perfectly matching tree associated with it.
     """
-    csvwriter = csv.writer(open('swda-actags-and-rootlabels.csv', 'wt'))
-    csvwriter.writerow(['ActTag', 'DamslActTag', 'RootNode'])
-    corpus = CorpusReader('swda')    
-    for utt in corpus.iter_utterances(display_progress=True):
-        if utt.tree_is_perfect_match():
-            csvwriter.writerow([utt.act_tag, utt.damsl_act_tag(), utt.trees[0].label()])
+    corpus = CorpusReader('swda')
+    corpus.export('swda-actags-and-rootlabels.csv',
+                  ['act_tag', 'damsl_act_tag', 'root_label'],
+                  header=['ActTag', 'DamslActTag', 'RootNode'],
+                  where='tree_is_perfect_match')
 
 ######################################################################
 
@@ -92,9 +90,7 @@ def act_tags_and_text():
 
     This data can be used for training a speechAct classifier
     """
-    csvwriter = csv.writer(open('swda-acttags-and-text.csv', 'wt'))
-    csvwriter.writerow(['DamslActTag', 'Text'])
     corpus = CorpusReader('swda')
-    for utt in corpus.iter_utterances(display_progress=True):
-        clean_words = utt.text_words(filter_disfluency=True)
-        csvwriter.writerow([utt.damsl_act_tag(), " ".join(clean_words)])
+    corpus.export('swda-acttags-and-text.csv',
+                  ['damsl_act_tag', 'clean_text'],
+                  header=['DamslActTag', 'Text'])